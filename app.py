@@ -1,9 +1,38 @@
 # app.py
 
+# Parchear los sockets ANTES de importar psycopg2/Flask para que, bajo
+# `gunicorn -k gevent`, las esperas de red (Postgres, Gemini) cedan el control
+# en lugar de bloquear al worker. Sin gevent instalado seguimos en modo síncrono.
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+except ImportError:
+    pass
+
 import os
-import psycopg2
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from uuid import uuid4
+
+# Bajo PyPy no existe psycopg2-binary: psycopg2cffi es un reemplazo drop-in
+# que se registra bajo el mismo nombre de módulo.
+try:
+    import psycopg2
+except ImportError:
+    from psycopg2cffi import compat
+    compat.register()
+    import psycopg2
+import psycopg2.pool
+from psycopg2.extras import RealDictCursor
+from cachetools import TTLCache
+import orjson
 import google.generativeai as genai
 from flask import Flask, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -12,8 +41,18 @@ from dotenv import load_dotenv
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Serializa JSON con orjson (C/Rust), mucho más rápido que el json estándar."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Configurar la aplicación Flask y habilitar CORS para React
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Configurar la API de Gemini con la clave del .env
@@ -26,23 +65,144 @@ except Exception as e:
     gemini_model = None
 
 
-# --- FUNCIÓN DE CONEXIÓN A LA BASE DE DATOS --- 🐘
+# --- CACHÉ DE LECTURAS --- ⚡
+
+# Los artículos son de solo lectura (se cargan con seed_database.py), así que
+# un caché TTL en memoria evita ir a Postgres en peticiones repetidas.
+# Clave: article_id para el artículo completo, (article_id, campo) para un campo.
+# cachetools NO es thread-safe (hasta get() muta el estado de expiración) y los
+# handlers corren en hilos bajo el dev server / gunicorn síncrono, así que todo
+# acceso va bajo este lock.
+ARTICLE_CACHE = TTLCache(maxsize=10_000, ttl=300)
+ARTICLE_CACHE_LOCK = threading.Lock()
+
+# Campos de la tabla 'articles' que la API puede exponer. Cualquier columna
+# que se interpole en un SELECT debe pasar antes por este conjunto
+# (frozenset: membership O(1) y sin reconstruirlo por petición).
+ALLOWED_FIELDS = frozenset({"title", "author", "pub_year", "abstract", "key_words", "related_articles", "summary_sentence"})
+
+# SQL por campo precalculado para no armar f-strings en el camino caliente
+# (las sentencias art_<campo> se preparan por conexión, ver prepare_statements)
+FIELD_EXECUTE_SQL = {field: f"EXECUTE art_{field}(%s);" for field in ALLOWED_FIELDS}
+
+# Caché de respuestas de Gemini: una llamada al LLM cuesta cientos de ms,
+# así que las consultas repetidas se sirven desde memoria durante una hora.
+GEMINI_CACHE = TTLCache(maxsize=5_000, ttl=3600)
+
+# Partes estáticas del prompt de búsqueda, armadas una sola vez en vez de
+# reconstruir el f-string completo en cada petición. El SDK acepta una lista
+# de partes, así que la consulta del usuario se intercala entre ambas.
+PROMPT_PREFIX = (
+    "Eres un asistente experto en investigación académica.\n"
+    'Basado en la siguiente consulta de un usuario: "'
+)
+PROMPT_SUFFIX = (
+    '", genera un resumen conciso y relevante de 2 o 3 oraciones\n'
+    "que capture la idea principal de la búsqueda. Este resumen se mostrará en una interfaz de usuario."
+)
+
+# Límite para acotar el costo de tokenización y evitar prompts desmedidos
+MAX_QUERY_LENGTH = 2000
+
+# Búsquedas en segundo plano: el POST devuelve un job id al instante y el
+# cliente consulta el resultado, así los workers HTTP no quedan bloqueados
+# el segundo (o más) que tarda Gemini.
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=16)
+SEARCH_JOBS = TTLCache(maxsize=5_000, ttl=600)
+
+# GEMINI_CACHE y SEARCH_JOBS se tocan desde los hilos del executor además de
+# los handlers; mismo motivo que ARTICLE_CACHE_LOCK, lock propio para que las
+# búsquedas no compitan con las lecturas de artículos.
+SEARCH_CACHE_LOCK = threading.Lock()
+
+def gemini_cache_key(user_query):
+    """Normaliza la consulta y devuelve un hash corto para usar como clave."""
+    normalized = user_query.strip().lower().encode("utf-8")
+    return hashlib.blake2b(normalized, digest_size=16).hexdigest()
+
+
+# --- CONEXIÓN A LA BASE DE DATOS (POOL) --- 🐘
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Conexión del pool con una marca de si ya ejecutó los PREPARE."""
+    prepared = False
+
+# Sentencias con forma fija: se preparan una vez por conexión para que
+# Postgres no vuelva a parsear/planificar el SQL en cada petición.
+PREPARED_STATEMENTS = [
+    """PREPARE art_bulk AS
+       SELECT id, title, author, pub_year, abstract, key_words, related_articles, summary_sentence
+       FROM articles WHERE id = ANY($1);"""
+] + [
+    f"PREPARE art_{field} AS SELECT {field} FROM articles WHERE id = $1;"
+    for field in ALLOWED_FIELDS
+]
+
+def prepare_statements(conn):
+    """Ejecuta los PREPARE en una conexión recién salida del pool (solo una vez)."""
+    with conn.cursor() as cur:
+        for statement in PREPARED_STATEMENTS:
+            cur.execute(statement)
+    conn.commit()
+    conn.prepared = True
+
+# La configuración de la BD se lee del entorno UNA sola vez y se valida acá:
+# si falta una variable es mejor enterarse al arrancar que en la primera petición.
+_missing_vars = [var for var in ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD") if not os.getenv(var)]
+if _missing_vars:
+    print(f"Advertencia: faltan variables de entorno de la BD: {', '.join(_missing_vars)}")
+
+DB_DSN = (
+    f"host={os.getenv('DB_HOST')} port={os.getenv('DB_PORT')} "
+    f"dbname={os.getenv('DB_NAME')} user={os.getenv('DB_USER')} "
+    f"password={os.getenv('DB_PASSWORD')}"
+)
+
+# Un pool compartido evita pagar el handshake TCP+TLS+auth de psycopg2.connect()
+# en cada petición; las conexiones se reutilizan entre requests.
+try:
+    db_pool = psycopg2.pool.ThreadedConnectionPool(
+        2,  # minconn
+        20,  # maxconn
+        DB_DSN,
+        connection_factory=PooledConnection
+    )
+except psycopg2.OperationalError as e:
+    print(f"Error al crear el pool de conexiones: {e}")
+    db_pool = None
 
 def get_db_connection():
-    """Crea y retorna una conexión a la base de datos PostgreSQL."""
+    """Obtiene una conexión del pool (devolverla con db_pool.putconn)."""
+    if db_pool is None:
+        return None
     try:
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT"),
-            dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD")
-        )
-        return conn
-    except psycopg2.OperationalError as e:
-        print(f"Error al conectar con la base de datos: {e}")
+        conn = db_pool.getconn()
+    except psycopg2.pool.PoolError as e:
+        print(f"Error al obtener una conexión del pool: {e}")
         return None
 
+    if not conn.prepared:
+        try:
+            prepare_statements(conn)
+        except Exception as e:
+            # Si el PREPARE falla (la tabla todavía no existe, la conexión
+            # murió esperando en el pool, etc.) hay que devolver la conexión
+            # descartándola: si no, cada fallo filtra una y el pool se agota.
+            print(f"Error al preparar la conexión: {e}")
+            db_pool.putconn(conn, close=True)
+            return None
+    return conn
+
+@contextmanager
+def db_conn():
+    """Context manager que presta una conexión del pool y la devuelve al salir."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            db_pool.putconn(conn)
+
 
 # --- ENDPOINTS GENERALES DE LA API ---
 
@@ -51,37 +211,132 @@ def index():
     """Endpoint raíz para verificar que la API está funcionando."""
     return jsonify({"status": "API funcionando correctamente"})
 
+def cacheable_json(payload):
+    """Respuesta JSON con ETag y Cache-Control para que navegadores y CDNs cacheen.
+
+    Si el cliente ya tiene la versión actual (If-None-Match), contestamos 304
+    sin cuerpo, que cuesta ~0 bytes y nada de serialización en el cliente.
+    """
+    etag = hashlib.blake2b(orjson.dumps(payload), digest_size=8).hexdigest()
+    resp = jsonify(payload)
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    # set_etag emite el entity-tag entre comillas como exige RFC 7232 y
+    # make_conditional se encarga de If-None-Match (incluido '*'),
+    # devolviendo un 304 que conserva ETag/Cache-Control.
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+def fetch_articles_by_ids(article_ids):
+    """Trae varios artículos en una sola consulta y devuelve {id: artículo}.
+
+    Los ids ya cacheados se sirven desde ARTICLE_CACHE; el resto se pide
+    con un único SELECT ... WHERE id = ANY(...) en lugar de N consultas.
+    """
+    articles = {}
+    missing = []
+    with ARTICLE_CACHE_LOCK:
+        for article_id in article_ids:
+            cached = ARTICLE_CACHE.get(article_id)
+            if cached is not None:
+                articles[article_id] = cached
+            else:
+                missing.append(article_id)
+
+    if not missing:
+        return articles
+
+    with db_conn() as conn:
+        if conn is None:
+            raise psycopg2.OperationalError("No se pudo conectar a la base de datos")
+
+        # RealDictCursor ya devuelve cada fila como dict, sin zip manual.
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("EXECUTE art_bulk(%s);", (missing,))
+            rows = cur.fetchall()
+
+    with ARTICLE_CACHE_LOCK:
+        for article_dict in rows:
+            ARTICLE_CACHE[article_dict["id"]] = article_dict
+            articles[article_dict["id"]] = article_dict
+
+    return articles
+
+@app.route("/api/articles", methods=['GET'])
+def get_articles_bulk():
+    """Obtiene varios artículos de golpe: /api/articles?ids=1,2,3."""
+    ids_param = request.args.get("ids", "")
+    try:
+        article_ids = [int(part) for part in ids_param.split(",") if part.strip()]
+    except ValueError:
+        return jsonify({"error": "El parámetro 'ids' debe ser una lista de enteros separados por comas"}), 400
+
+    if not article_ids:
+        return jsonify({"error": "El parámetro 'ids' es requerido, ej: ?ids=1,2,3"}), 400
+
+    try:
+        articles = fetch_articles_by_ids(article_ids)
+        return cacheable_json({str(article_id): article for article_id, article in articles.items()})
+    except psycopg2.OperationalError:
+        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
+    except Exception as e:
+        return jsonify({"error": f"Ocurrió un error en el servidor: {e}"}), 500
+
 @app.route("/api/articles/<int:article_id>", methods=['GET'])
 def get_article_by_id(article_id):
-    """Obtiene todos los datos de un artículo específico."""
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
+    """Obtiene un artículo; con ?fields=title,author devuelve solo esos campos."""
+    fields_param = request.args.get("fields", "")
+    if fields_param:
+        requested = [f.strip() for f in fields_param.split(",") if f.strip()]
+        safe_fields = [f for f in requested if f in ALLOWED_FIELDS]
+        if not safe_fields:
+            return jsonify({"error": "Campo no válido"}), 400
+        return get_article_projection(article_id, safe_fields)
 
     try:
-        cur = conn.cursor()
-        query = """
-            SELECT id, title, author, pub_year, abstract, key_words, related_articles, summary_sentence
-            FROM articles
-            WHERE id = %s;
-        """
-        cur.execute(query, (article_id,))
-        article_data = cur.fetchone()
-        
-        if article_data:
-            column_names = [desc[0] for desc in cur.description]
-            article_dict = dict(zip(column_names, article_data))
-            cur.close()
-            return jsonify(article_dict)
-        else:
-            cur.close()
-            return jsonify({"error": "Artículo no encontrado"}), 404
-            
+        articles = fetch_articles_by_ids([article_id])
+    except psycopg2.OperationalError:
+        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
     except Exception as e:
         return jsonify({"error": f"Ocurrió un error en el servidor: {e}"}), 500
-    finally:
-        if conn:
-            conn.close()
+
+    article_dict = articles.get(article_id)
+    if article_dict:
+        return cacheable_json(article_dict)
+    else:
+        return jsonify({"error": "Artículo no encontrado"}), 404
+
+def search_articles_by_keyword(user_query):
+    """Busca artículos cuyo key_words contenga la consulta exacta.
+
+    Usa el índice GIN sobre key_words (ver seed_database.py), así que una
+    búsqueda tipo lookup no necesita pasar por Gemini. Retorna una lista de
+    artículos (posiblemente vacía), o None si la BD no está disponible.
+    """
+    try:
+        with db_conn() as conn:
+            if conn is None:
+                return None
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT id, title, author, pub_year, summary_sentence FROM articles WHERE key_words @> ARRAY[%s];",
+                    (user_query.strip(),)
+                )
+                return cur.fetchall()
+    except Exception as e:
+        print(f"Error en la búsqueda por keyword: {e}")
+        return None
+
+def generate_gemini_summary(user_query):
+    """Genera (o recupera del caché) el resumen de Gemini para una consulta."""
+    cache_key = gemini_cache_key(user_query)
+    with SEARCH_CACHE_LOCK:
+        cached_summary = GEMINI_CACHE.get(cache_key)
+    if cached_summary is not None:
+        return cached_summary
+    response = gemini_model.generate_content([PROMPT_PREFIX, user_query, PROMPT_SUFFIX])
+    with SEARCH_CACHE_LOCK:
+        GEMINI_CACHE[cache_key] = response.text
+    return response.text
 
 @app.route("/api/search", methods=['POST'])
 def search_with_gemini():
@@ -94,83 +349,147 @@ def search_with_gemini():
         return jsonify({"error": "La clave 'query' es requerida en el cuerpo de la petición"}), 400
         
     user_query = data['query']
-    prompt = f"""
-    Eres un asistente experto en investigación académica.
-    Basado en la siguiente consulta de un usuario: "{user_query}", genera un resumen conciso y relevante de 2 o 3 oraciones
-    que capture la idea principal de la búsqueda. Este resumen se mostrará en una interfaz de usuario.
-    """
-    
-    try:
-        response = gemini_model.generate_content(prompt)
+    if len(user_query) > MAX_QUERY_LENGTH:
+        return jsonify({"error": f"La consulta no puede superar los {MAX_QUERY_LENGTH} caracteres"}), 400
+
+    # Primero probamos un match exacto de keyword contra la BD: si hay
+    # resultados, nos ahorramos la llamada al LLM por completo.
+    keyword_hits = search_articles_by_keyword(user_query)
+    if keyword_hits:
         return jsonify({
             "user_query": user_query,
-            "gemini_summary": response.text
+            "source": "keywords",
+            "articles": keyword_hits
+        })
+
+    # Si ya respondimos exactamente esta consulta hace poco, no volvemos a Gemini.
+    cache_key = gemini_cache_key(user_query)
+    with SEARCH_CACHE_LOCK:
+        cached_summary = GEMINI_CACHE.get(cache_key)
+    if cached_summary is not None:
+        resp = jsonify({
+            "user_query": user_query,
+            "gemini_summary": cached_summary
         })
+        resp.headers["X-Cache"] = "HIT"
+        return resp
+
+    try:
+        summary = generate_gemini_summary(user_query)
+        resp = jsonify({
+            "user_query": user_query,
+            "gemini_summary": summary
+        })
+        resp.headers["X-Cache"] = "MISS"
+        return resp
     except Exception as e:
         return jsonify({"error": f"Ocurrió un error al contactar a Gemini: {e}"}), 503
 
+@app.route("/api/search/async", methods=['POST'])
+def search_with_gemini_async():
+    """Encola la búsqueda en Gemini y devuelve un job id para consultar después."""
+    if not gemini_model:
+        return jsonify({"error": "El modelo de Gemini no está configurado correctamente"}), 500
 
-# --- FUNCIÓN AUXILIAR Y ENDPOINTS ESPECÍFICOS POR CAMPO ---
+    data = request.get_json()
+    if not data or 'query' not in data:
+        return jsonify({"error": "La clave 'query' es requerida en el cuerpo de la petición"}), 400
 
-def get_field_for_article(article_id, field_name):
-    """Función genérica para obtener un solo campo de un artículo."""
-    allowed_fields = ["title", "author", "pub_year", "abstract", "key_words", "related_articles", "summary_sentence"]
-    if field_name not in allowed_fields:
-        return jsonify({"error": "Campo no válido"}), 400
+    user_query = data['query']
+    if len(user_query) > MAX_QUERY_LENGTH:
+        return jsonify({"error": f"La consulta no puede superar los {MAX_QUERY_LENGTH} caracteres"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
-    
-    try:
-        cur = conn.cursor()
-        query = f"SELECT {field_name} FROM articles WHERE id = %s;"
-        cur.execute(query, (article_id,))
-        data = cur.fetchone()
-        cur.close()
-
-        if data:
-            return jsonify({field_name: data[0]})
-        else:
-            return jsonify({"error": "Artículo no encontrado"}), 404
-    except Exception as e:
-        return jsonify({"error": f"Ocurrió un error en el servidor: {e}"}), 500
-    finally:
-        if conn:
-            conn.close()
+    future = SEARCH_EXECUTOR.submit(generate_gemini_summary, user_query)
+    job_id = uuid4().hex
+    with SEARCH_CACHE_LOCK:
+        SEARCH_JOBS[job_id] = (user_query, future)
+    return jsonify({"job_id": job_id, "status": "pending"}), 202
+
+@app.route("/api/search/<job_id>", methods=['GET'])
+def get_search_result(job_id):
+    """Consulta el estado/resultado de una búsqueda encolada con /api/search/async."""
+    with SEARCH_CACHE_LOCK:
+        job = SEARCH_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job no encontrado o expirado"}), 404
+
+    user_query, future = job
+    if not future.done():
+        return jsonify({"job_id": job_id, "status": "pending"}), 202
+
+    error = future.exception()
+    if error is not None:
+        return jsonify({"error": f"Ocurrió un error al contactar a Gemini: {error}"}), 503
+
+    return jsonify({
+        "job_id": job_id,
+        "status": "done",
+        "user_query": user_query,
+        "gemini_summary": future.result()
+    })
 
-@app.route("/api/articles/<int:article_id>/title", methods=['GET'])
-def get_article_title(article_id):
-    return get_field_for_article(article_id, "title")
 
-@app.route("/api/articles/<int:article_id>/author", methods=['GET'])
-def get_article_author(article_id):
-    return get_field_for_article(article_id, "author")
+# --- FUNCIÓN AUXILIAR Y ENDPOINTS ESPECÍFICOS POR CAMPO ---
+
+def get_article_projection(article_id, safe_fields):
+    """Obtiene un subconjunto de campos (ya validados) con un solo SELECT."""
+    cache_key = (article_id, ",".join(safe_fields))
+    with ARTICLE_CACHE_LOCK:
+        cached = ARTICLE_CACHE.get(cache_key)
+    if cached is not None:
+        return cacheable_json(cached)
+
+    with db_conn() as conn:
+        if not conn:
+            return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
 
-@app.route("/api/articles/<int:article_id>/year", methods=['GET'])
-def get_article_year(article_id):
-    return get_field_for_article(article_id, "pub_year")
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                if len(safe_fields) == 1:
+                    # Un solo campo: usamos la sentencia ya preparada en la conexión.
+                    cur.execute(FIELD_EXECUTE_SQL[safe_fields[0]], (article_id,))
+                else:
+                    # safe_fields ya pasó por ALLOWED_FIELDS, así que interpolar es seguro.
+                    query = f"SELECT {', '.join(safe_fields)} FROM articles WHERE id = %s;"
+                    cur.execute(query, (article_id,))
+                data = cur.fetchone()
 
-@app.route("/api/articles/<int:article_id>/abstract", methods=['GET'])
-def get_article_abstract(article_id):
-    return get_field_for_article(article_id, "abstract")
+            if data:
+                with ARTICLE_CACHE_LOCK:
+                    ARTICLE_CACHE[cache_key] = data
+                return cacheable_json(data)
+            else:
+                return jsonify({"error": "Artículo no encontrado"}), 404
+        except Exception as e:
+            return jsonify({"error": f"Ocurrió un error en el servidor: {e}"}), 500
 
-@app.route("/api/articles/<int:article_id>/keywords", methods=['GET'])
-def get_article_keywords(article_id):
-    return get_field_for_article(article_id, "key_words")
+def get_field_for_article(article_id, field_name):
+    """Función genérica para obtener un solo campo de un artículo."""
+    if field_name not in ALLOWED_FIELDS:
+        return jsonify({"error": "Campo no válido"}), 400
+    return get_article_projection(article_id, [field_name])
 
-@app.route("/api/articles/<int:article_id>/related", methods=['GET'])
-def get_related_articles(article_id):
-    return get_field_for_article(article_id, "related_articles")
+# Mapeo de los nombres usados en la URL a las columnas reales de la tabla
+FIELD_ALIASES = {
+    "title": "title",
+    "author": "author",
+    "year": "pub_year",
+    "abstract": "abstract",
+    "keywords": "key_words",
+    "related": "related_articles",
+    "summary": "summary_sentence",
+}
 
-@app.route("/api/articles/<int:article_id>/summary", methods=['GET'])
-def get_article_summary(article_id):
-    return get_field_for_article(article_id, "summary_sentence")
+@app.route("/api/articles/<int:article_id>/<any(title,author,year,abstract,keywords,related,summary):field>", methods=['GET'])
+def get_article_field(article_id, field):
+    """Sirve los siete endpoints por campo con una sola regla de ruteo."""
+    return get_field_for_article(article_id, FIELD_ALIASES[field])
 
 
 # --- INICIAR LA APLICACIÓN (PARA DESARROLLO LOCAL) ---
 
 if __name__ == '__main__':
     # Esta sección solo se usa cuando ejecutas `python app.py` directamente.
-    # Gunicorn no la utiliza en producción.
-    app.run(debug=True, port=5000)
+    # En producción usar:
+    #   gunicorn -k gevent -w 4 --worker-connections 500 app:app
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", port=5000)
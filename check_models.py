@@ -1,14 +1,53 @@
-import google.generativeai as genai
 import os
+import json
+import time
+import google.generativeai as genai
 from dotenv import load_dotenv
 
-# Carga tu clave de API desde el archivo .env
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Dónde guardamos la lista de modelos para no consultar a Google en cada ejecución
+CACHE_FILE = os.path.expanduser("~/.cache/hack25/models.json")
+CACHE_TTL_SECONDS = 24 * 60 * 60  # 24 horas
+
+# Evita llamar a genai.configure más de una vez con la misma clave
+_configured_key = None
+
+def configure_genai():
+    """Configura la API de Gemini solo si la clave cambió desde la última vez."""
+    global _configured_key
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key != _configured_key:
+        genai.configure(api_key=api_key)
+        _configured_key = api_key
+
+def get_generation_models():
+    """Retorna los nombres de modelos que soportan 'generateContent'.
+
+    Usa un caché en disco con TTL de 24 h para evitar el round-trip de red
+    en cada invocación del script.
+    """
+    # Si el caché existe y es reciente, lo usamos directamente
+    if os.path.exists(CACHE_FILE):
+        age = time.time() - os.path.getmtime(CACHE_FILE)
+        if age < CACHE_TTL_SECONDS:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+    # Caché vencido o inexistente: consultamos a Google y lo refrescamos
+    configure_genai()
+    model_names = [
+        model.name
+        for model in genai.list_models()
+        if 'generateContent' in model.supported_generation_methods
+    ]
+
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(model_names, f)
 
-print("Buscando modelos que soporten 'generateContent'...")
+    return model_names
 
-# Itera sobre los modelos disponibles y muestra solo los compatibles
-for model in genai.list_models():
-  if 'generateContent' in model.supported_generation_methods:
-    print(model.name)
\ No newline at end of file
+if __name__ == '__main__':
+    print("Buscando modelos que soporten 'generateContent'...")
+    for name in get_generation_models():
+        print(name)
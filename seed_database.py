@@ -1,8 +1,15 @@
 import os
+import csv
+import io
 import json
 import psycopg2
 from dotenv import load_dotenv
 
+def to_pg_array(values):
+    """Convierte una lista de Python al literal de array de Postgres: {"a","b"}."""
+    escaped = ['"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"' for v in values]
+    return '{' + ','.join(escaped) + '}'
+
 def seed_data():
     """
     Lee los datos de data.json y los inserta en la tabla 'articles' de la base de datos.
@@ -27,34 +34,58 @@ def seed_data():
         )
         cur = conn.cursor()
 
-        # Prepara el comando SQL para insertar un artículo
+        # Arma un CSV en memoria con todas las filas.
         # Las columnas de la BD están en inglés, los datos en el JSON en español.
-        # Aquí hacemos el "mapeo" correcto.
-        insert_query = """
-            INSERT INTO articles (title, author, pub_year, abstract, key_words, related_articles, summary_sentence)
-            VALUES (%s, %s, %s, %s, %s, %s, %s);
-        """
-        
-        # Itera sobre cada artículo en el JSON y lo inserta en la base de datos
+        # Aquí hacemos el "mapeo" correcto; las listas van como literales de
+        # array de Postgres ({"a","b"}) porque COPY no pasa por el adaptador
+        # de psycopg2.
+        buf = io.StringIO()
+        writer = csv.writer(buf)
         for article in articles_data:
-            print(f"Insertando artículo: {article['título']}")
-            
-            # Crea una tupla de datos en el orden correcto para la consulta SQL
-            article_tuple = (
+            writer.writerow((
                 article['título'],
                 article['autor'],
                 article['año de publicación'],
                 article['abstract'],
-                article['keywords'],  # psycopg2 convierte listas de Python a arrays de PostgreSQL
-                article['artículos relacionados —grafo'],
+                to_pg_array(article['keywords']),
+                to_pg_array(article['artículos relacionados —grafo']),
                 article['Frase de resumen']
-            )
-            
-            # Ejecuta la inserción
-            cur.execute(insert_query, article_tuple)
+            ))
+        buf.seek(0)
+
+        # COPY FROM STDIN: una sola operación de streaming, sin parsear
+        # un INSERT por fila — la vía de ingesta más rápida de Postgres.
+        print(f"Insertando {len(articles_data)} artículos...")
+        cur.copy_expert(
+            "COPY articles (title, author, pub_year, abstract, key_words, related_articles, summary_sentence) FROM STDIN WITH CSV",
+            buf
+        )
 
         # Confirma todos los cambios en la base de datos
         conn.commit()
+
+        # Asegura los índices: búsqueda puntual por id y búsqueda por keyword
+        # (el índice GIN permite usar key_words @> ARRAY[...] sin seq scan)
+        print("Creando índices...")
+
+        # Solo crea el índice único sobre id si la tabla no tiene ya uno:
+        # lo normal es que id sea PRIMARY KEY y un segundo índice único
+        # idéntico solo encarecería cada insert futuro.
+        cur.execute("""
+            SELECT 1
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = 'articles'::regclass
+              AND i.indisunique
+              AND i.indnkeyatts = 1
+              AND a.attname = 'id';
+        """)
+        if cur.fetchone() is None:
+            cur.execute("CREATE UNIQUE INDEX articles_id_idx ON articles(id);")
+
+        cur.execute("CREATE INDEX IF NOT EXISTS articles_kw_gin ON articles USING GIN(key_words);")
+        conn.commit()
+
         print(f"\n✅ ¡Éxito! Se han insertado {len(articles_data)} artículos en la base de datos.")
 
     except (Exception, psycopg2.DatabaseError) as error: